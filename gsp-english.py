@@ -3,7 +3,86 @@
     """
 import numpy as np
 from typing import List, Tuple
-import random
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, fall back to plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True)
+def _ctr_ratio(ctr_ratios, i):
+    """
+    CTR ratio αi/αi-1 used in the dropout price when i advertisers remain.
+    """
+    # With i advertisers remaining, the next to drop out gets position i-1;
+    # positions past the last slot have zero CTR
+    ratio_index = i - 2
+    if 0 <= ratio_index < ctr_ratios.size:
+        return ctr_ratios[ratio_index]
+    return 0.0
+
+
+@njit(cache=True)
+def _run_auction_core(values_np, ctr_ratios, n_slots):
+    """
+    Array-only core of GeneralizedEnglishAuction.run_auction.
+    
+    Returns:
+    - allocation: Advertiser index per slot (-1 if unfilled)
+    - prices: Per-click prices for each advertiser
+    - history: Dropout price buffer, valid up to n_history
+    - n_history: Number of recorded dropout prices
+    """
+    n_advertisers = values_np.size
+    active_mask = np.ones(n_advertisers, dtype=np.bool_)
+    active_idx = np.flatnonzero(active_mask)
+    history = np.empty(n_advertisers, dtype=np.float64)
+    n_history = 0
+    allocation = np.full(n_slots, -1, dtype=np.int32)
+    prices = np.zeros(n_advertisers, dtype=np.float64)
+    dropout_buf = np.empty(n_advertisers, dtype=np.float64)  # Reused every round
+    
+    # Start with the lowest slot to be filled first
+    next_slot_to_fill = n_slots - 1
+    
+    # Auction continues until only one advertiser remains or all slots filled;
+    # advertisers dropping out while more remain than slots get nothing
+    while active_idx.size > 1 and (active_idx.size > n_slots or next_slot_to_fill >= 0):
+        bi_minus_1 = history[n_history - 1] if n_history > 0 else 0.0
+        ratio = _ctr_ratio(ctr_ratios, active_idx.size)
+        
+        # Find advertiser with lowest dropout price
+        vals = values_np[active_idx]
+        dropout_prices = dropout_buf[:active_idx.size]
+        np.subtract(vals, bi_minus_1, dropout_prices)
+        np.multiply(dropout_prices, ratio, dropout_prices)
+        np.subtract(vals, dropout_prices, dropout_prices)
+        j = np.argmin(dropout_prices)
+        next_dropout = active_idx[j]
+        
+        if active_idx.size <= n_slots:
+            # Assign this advertiser to the next available slot and it pays
+            # the previous dropout price
+            allocation[next_slot_to_fill] = next_dropout
+            prices[next_dropout] = bi_minus_1
+            next_slot_to_fill -= 1
+        
+        # Update history and active advertisers
+        history[n_history] = dropout_prices[j]
+        n_history += 1
+        active_mask[next_dropout] = False
+        active_idx = np.flatnonzero(active_mask)
+    
+    # Last remaining advertiser gets the highest slot at the last dropout price
+    if active_idx.size > 0 and next_slot_to_fill >= 0:
+        winner = active_idx[0]
+        allocation[0] = winner
+        prices[winner] = history[n_history - 1] if n_history > 0 else 0.0
+    return allocation, prices, history, n_history
 
 class GeneralizedEnglishAuction:
     def __init__(self, n_slots: int, ctrs: List[float], values: List[float]):
@@ -19,11 +98,21 @@ class GeneralizedEnglishAuction:
         self.ctrs = ctrs
         self.values = values
         self.n_advertisers = len(values)
+        self.values_np = np.asarray(values, dtype=np.float64)
+        self.ctrs_np = np.asarray(ctrs, dtype=np.float64)
         
         # Ensure we have CTRs for all slots plus a zero CTR for no slot
         assert len(ctrs) == n_slots + 1, "CTRs should be provided for all slots plus a zero CTR"
         assert ctrs[-1] == 0, "Last CTR should be 0"
         
+        # αi/αi-1 for each position i >= 1, 0 where the higher CTR is 0
+        higher_ctrs = self.ctrs_np[:-1]
+        self.ctr_ratios = np.where(
+            higher_ctrs != 0,
+            self.ctrs_np[1:] / np.where(higher_ctrs == 0, 1, higher_ctrs),
+            0.0,
+        )
+        
     def equilibrium_dropout_price(self, i: int, history: List[float], value: float) -> float:
         """
         Calculate the equilibrium dropout price according to the theorem.
@@ -42,17 +131,10 @@ class GeneralizedEnglishAuction:
         else:
             bi_minus_1 = history[-1]
         
-        # With i advertisers remaining, the next to drop out gets position i-1
-        position_index = i - 1
-        
-        # Get CTRs for current and next higher positions
-        alpha_i = self.ctrs[position_index] if position_index<len(self.ctrs) else  self.ctrs[-2]
-        alpha_i_minus_1 = self.ctrs[position_index - 1] if position_index<len(self.ctrs)-1 else  self.ctrs[-3]
-        
         # Apply the formula in therom 2 : pk(i, h, sk) = sk - (αi/αi-1)(sk - bi-1)
-        dropout_price = value - (alpha_i / alpha_i_minus_1) * (value - bi_minus_1)
+        dropout_price = value - _ctr_ratio(self.ctr_ratios, i) * (value - bi_minus_1)
         return dropout_price
-    
+
     def run_auction(self) -> Tuple[List[int], List[float], List[float]]:
         """
         Run the Generalized English Auction.
@@ -62,69 +144,10 @@ class GeneralizedEnglishAuction:
         - prices: Per-click prices for each advertiser
         - history: Dropout price history
         """
-        active_advertisers = list(range(self.n_advertisers))
-        history = []  # Dropout price history
-        allocation = [-1] * self.n_slots  # Which advertiser gets which slot
-        prices = [0] * self.n_advertisers  # Per-click prices
-        
-        # Start with the lowest slot to be filled first
-        next_slot_to_fill = self.n_slots - 1
-        dropout_prices = []
-
-        while len(active_advertisers) > self.n_slots:
-            dropout_prices = []
-            for adv in active_advertisers:
-                price = self.equilibrium_dropout_price(
-                    len(active_advertisers),
-                    history,
-                    self.values[adv]
-                )
-                dropout_prices.append((adv, price))
-            # Find advertiser with lowest dropout price
-            dropout_prices.sort(key=lambda x: x[1])
-            next_dropout, price = dropout_prices[0]
-            prices[next_dropout] = 0  # Dropped out, no slot, pays nothing
-            history.append(price)
-            active_advertisers.remove(next_dropout)
-        # Auction continues until only one advertiser remains or all slots filled
-        while len(active_advertisers) > 1 and next_slot_to_fill >= 0:
-            # Calculate dropout prices for each active advertiser
-            dropout_prices = []
-            for adv in active_advertisers:
-                price = self.equilibrium_dropout_price(
-                    len(active_advertisers), 
-                    history, 
-                    self.values[adv]
-                )
-                dropout_prices.append((adv, price))
-            
-            # Find advertiser with lowest dropout price
-            dropout_prices.sort(key=lambda x: x[1])
-            next_dropout, price = dropout_prices[0]
-            
-            # Assign this advertiser to the next available slot
-            allocation[next_slot_to_fill] = next_dropout
-            
-            # This advertiser pays their dropout price
-            prices[next_dropout] = history[-1] if history else 0
-
-            next_slot_to_fill -= 1
-            
-            # Update history and active advertisers
-            history.append(price)
-            active_advertisers.remove(next_dropout)
-        
-        # Last remaining advertiser gets the highest slot
-        if active_advertisers and next_slot_to_fill >= 0:
-            allocation[0] = active_advertisers[0]
-            
-            # The price for the top slot is the last dropout price
-            if history:
-                prices[active_advertisers[0]] = history[-1]
-            else:
-                prices[active_advertisers[0]] = 0
-        print(dropout_prices,"dropout")
-        return allocation, prices, history
+        allocation, prices, history, n_history = _run_auction_core(
+            self.values_np, self.ctr_ratios, self.n_slots
+        )
+        return allocation.tolist(), prices.tolist(), history[:n_history].tolist()
     
     def display_results(self, allocation: List[int], prices: List[float]):
         """
@@ -165,37 +188,42 @@ class GeneralizedEnglishAuction:
         - Each advertiser pays the externality they impose on others
         """
         # Sort advertisers by value
-        sorted_indices = np.argsort(-np.array(self.values))
+        order = np.argsort(-self.values_np)
+        sorted_vals = self.values_np[order]
+        if order.size == 0:
+            return []
         
-        vcg_prices = [0] * self.n_advertisers
+        # Advertisers who get slots, and the positions priced below them
+        k = min(self.n_slots, order.size)
+        m = min(self.n_slots + 1, order.size)
         
-        # Calculate VCG prices for advertisers who get slots
-        for i in range(min(self.n_slots, len(sorted_indices))):
-            advertiser = sorted_indices[i]
-            
-            # The VCG payment formula for position auctions:
-            # sum over positions below i: (CTR_difference) * (value of advertiser who would get that position)
-            payment = 0
-            for j in range(i+1, min(self.n_slots + 1, len(sorted_indices))):
-                next_advertiser = sorted_indices[j]
-                payment += (self.ctrs[j-1] - self.ctrs[j]) * self.values[next_advertiser]
-                
-            # Convert to per-click price
-            vcg_prices[advertiser] = payment / self.ctrs[i] if self.ctrs[i] > 0 else 0
-        
-        return vcg_prices
+        # The VCG payment formula for position auctions:
+        # sum over positions below i: (CTR_difference) * (value of advertiser who would get that position)
+        # computed for every winner at once as a reverse cumulative sum
+        contrib = (self.ctrs_np[:m - 1] - self.ctrs_np[1:m]) * sorted_vals[1:m]
+        payments = np.zeros(k)
+        payments[:m - 1] = np.cumsum(contrib[::-1])[::-1]
+        
+        # Convert to per-click price
+        slot_ctrs = self.ctrs_np[:k]
+        per_click = np.divide(payments, slot_ctrs, out=np.zeros(k), where=slot_ctrs > 0)
+        
+        vcg_prices = np.zeros(self.n_advertisers)
+        vcg_prices[order[:k]] = per_click
+        
+        return vcg_prices.tolist()
 
-def run_simulation(n_slots=4, n_advertisers=4, seed=35):
-    #np.random.seed(seed)
+def run_simulation(n_slots=4, n_advertisers=4, seed=35, show_results=False, rng=None):
+    if rng is None:
+        rng = np.random.default_rng(seed)
     
     # Generate CTRs - decreasing with position
-    ctrs = [random.random() for _ in range(n_slots)]
-
-    ctrs.sort(reverse=True)
-    ctrs.append(0)  # Add zero CTR for no slot
+    ctrs = np.empty(n_slots + 1)
+    ctrs[:-1] = np.sort(rng.random(n_slots))[::-1]
+    ctrs[-1] = 0  # Add zero CTR for no slot
     
     # Generate advertiser values from a gamma distribution
-    values = np.random.gamma(shape=5, scale=2, size=n_advertisers)
+    values = rng.gamma(shape=5, scale=2, size=n_advertisers)
     
     print("Auction Parameters:")
     print(f"Number of slots: {n_slots}")
@@ -207,8 +235,9 @@ def run_simulation(n_slots=4, n_advertisers=4, seed=35):
     auction = GeneralizedEnglishAuction(n_slots, ctrs, values)
     allocation, prices, history = auction.run_auction()
     
-    # Display results
-    auction.display_results(allocation, prices)
+    # Display results (opt-in, it prints one line per slot)
+    if show_results:
+        auction.display_results(allocation, prices)
     
     # Compare with VCG payments
     vcg_prices = auction.calculate_vcg_payments()
@@ -218,9 +247,15 @@ def run_simulation(n_slots=4, n_advertisers=4, seed=35):
     print("Advertiser | Value | GSP Price | VCG Price")
     print("-" * 50)
     
+    # Slot held by each advertiser, -1 for advertisers without one
+    allocation_np = np.array(allocation)
+    filled = allocation_np >= 0
+    adv_to_slot = -np.ones(auction.n_advertisers, dtype=np.int64)
+    adv_to_slot[allocation_np[filled]] = np.flatnonzero(filled)
+    
     for adv in range(auction.n_advertisers):
-        if adv in allocation:
-            slot = allocation.index(adv)
+        slot = int(adv_to_slot[adv])
+        if slot >= 0:
             print(f"{adv:9d} | {auction.values[adv]:.2f} | {prices[adv]:.2f} | {vcg_prices[adv]:.2f}")
         else:
             print(f"{adv:9d} | {auction.values[adv]:.2f} | {'N/A':>8} | {vcg_prices[adv]:.2f}")
@@ -228,4 +263,4 @@ def run_simulation(n_slots=4, n_advertisers=4, seed=35):
     return auction, allocation, prices, vcg_prices, history
 
 # Run the simulation
-auction, allocation, prices, vcg_prices, history = run_simulation()
+auction, allocation, prices, vcg_prices, history = run_simulation(show_results=True)
@@ -0,0 +1,120 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+import vcg_gsp
+from vcg_gsp import simulate_auctions, simulate_auctions_parallel
+
+
+def _run_kernel(kernel, bids, vals, slot_ctrs, *extra_args):
+    n_trials, n_slots = bids.shape[0], slot_ctrs.size
+    outputs = [
+        np.empty((n_trials, n_slots), dtype=np.int64),
+        np.empty((n_trials, n_slots), dtype=bids.dtype),
+        np.empty(n_trials),
+        np.empty((n_trials, n_slots), dtype=bids.dtype),
+        np.empty((n_trials, n_slots), dtype=bids.dtype),
+        np.empty(n_trials),
+        np.empty((n_trials, n_slots), dtype=bids.dtype),
+    ]
+    kernel(bids, vals, slot_ctrs, *outputs, *extra_args)
+    return outputs
+
+
+def test_parallel_workers_draw_distinct_streams_from_rng():
+    results = simulate_auctions_parallel(n_trials=6, n_workers=3, rng=np.random.default_rng(7))
+    chunks = [results.vals[0:2], results.vals[2:4], results.vals[4:6]]
+    assert not np.array_equal(chunks[0], chunks[1])
+    assert not np.array_equal(chunks[0], chunks[2])
+    assert not np.array_equal(chunks[1], chunks[2])
+
+    again = simulate_auctions_parallel(n_trials=6, n_workers=3, rng=np.random.default_rng(7))
+    assert np.array_equal(results.vals, again.vals)
+
+
+def test_parallel_after_serial_run_exits_cleanly():
+    # Forking workers after numba's parallel kernels ran used to hang the
+    # interpreter at exit with the TBB threading layer
+    script = textwrap.dedent("""
+        from vcg_gsp import simulate_auctions, simulate_auctions_parallel
+
+        if __name__ == "__main__":
+            simulate_auctions(n_trials=100, random_seed=0)
+            results = simulate_auctions_parallel(n_trials=10, n_workers=2, random_seed=1)
+            assert len(results) == 10
+    """)
+    completed = subprocess.run(
+        [sys.executable, "-c", script], cwd=REPO_ROOT, timeout=120
+    )
+    assert completed.returncode == 0
+
+
+def test_simulate_auctions_rejects_missing_ctrs():
+    with pytest.raises(ValueError):
+        simulate_auctions(n_slots=3, ctrs=[0.8, 0.5])
+
+
+@pytest.mark.skipif(not vcg_gsp._HAS_NUMBA, reason="numba is not installed")
+def test_tiny_kernel_matches_generic_kernel_on_ties_and_signed_zeros():
+    rng = np.random.default_rng(0)
+    for n_advertisers in range(1, vcg_gsp._TINY_ADVERTISERS + 1):
+        width = int(vcg_gsp._TINY_WIDTHS[np.searchsorted(vcg_gsp._TINY_WIDTHS, n_advertisers)])
+        network = vcg_gsp._TINY_NETWORKS[width]
+        for n_slots in range(1, n_advertisers + 1):
+            # Integer-valued bids force ties; zeros are a mix of 0.0 and -0.0
+            bids = rng.integers(-2, 3, (64, n_advertisers)).astype(np.float32)
+            zeros = bids == 0
+            bids[zeros] = np.where(rng.random(zeros.sum()) < 0.5, -0.0, 0.0)
+            vals = rng.random((64, n_advertisers), dtype=np.float32)
+            slot_ctrs = np.sort(rng.random(n_slots, dtype=np.float32))[::-1].copy()
+
+            generic = _run_kernel(vcg_gsp._price_trials_jit, bids, vals, slot_ctrs)
+            tiny = _run_kernel(
+                vcg_gsp._price_trials_tiny_jit, bids, vals, slot_ctrs, network, width
+            )
+            for expected, actual in zip(generic, tiny):
+                assert np.array_equal(expected, actual), (n_advertisers, n_slots)
+
+
+@pytest.mark.parametrize("use_numba", [False, True])
+def test_vcg_payments_match_per_slot_externality(monkeypatch, use_numba):
+    if use_numba and not vcg_gsp._HAS_NUMBA:
+        pytest.skip("numba is not installed")
+    monkeypatch.setattr(vcg_gsp, "_HAS_NUMBA", use_numba)
+    ctrs = [0.8, 0.5, 0.3]
+    results = simulate_auctions(
+        n_advertisers=6, n_slots=3, ctrs=ctrs, dist_params=(1, 10),
+        n_trials=20, random_seed=3, dtype=np.float64,
+    )
+    slot_ctrs = np.array(ctrs)
+    for t in range(len(results)):
+        # Externality of each winner: value of the others' allocation without
+        # it minus their value with it, per click of its slot
+        sorted_vals = np.sort(results.vals[t])[::-1]
+        value_with_all = np.sum(slot_ctrs * sorted_vals[:3])
+        expected = []
+        for i in range(3):
+            others_sorted = np.sort(np.delete(sorted_vals, i))[::-1]
+            value_without_i = np.sum(slot_ctrs * others_sorted[:3])
+            value_with_i = value_with_all - slot_ctrs[i] * sorted_vals[i]
+            expected.append((value_without_i - value_with_i) / slot_ctrs[i])
+        np.testing.assert_allclose(results.vcg_payments[t], expected)
+        np.testing.assert_allclose(results.gsp_payments[t], sorted_vals[1:4])
+
+
+@pytest.mark.parametrize("value_dist", ["uniform", "normal"])
+def test_simulate_auctions_keeps_dtype_with_numpy_scalar_params(value_dist):
+    results = simulate_auctions(
+        value_dist=value_dist, dist_params=(np.float64(1), np.float64(10)),
+        n_trials=4, random_seed=0, dtype=np.float32,
+    )
+    assert results.vals.dtype == np.float32
+    assert results.bids.dtype == np.float32
+    assert results.vcg_payments.dtype == np.float32
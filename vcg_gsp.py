@@ -1,5 +1,111 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
 import numpy as np
 
+try:
+    from numba import njit, prange, set_num_threads
+    _HAS_NUMBA = True
+except ImportError:  # numba is optional, fall back to the NumPy kernels
+    _HAS_NUMBA = False
+    prange = range
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Target working-set size of one block of trials in the NumPy path of
+# simulate_auctions, about half of a typical per-core L2 cache
+_BLOCK_BYTES = 128 * 1024
+
+def _odd_even_merge_sort_network(n):
+    """
+    Comparator pairs of Batcher's odd-even merge sort for n (a power of 2) keys.
+    """
+    pairs = []
+    p = 1
+    while p < n:
+        k = p
+        while k >= 1:
+            for j in range(k % p, n - k, 2 * k):
+                for i in range(min(k, n - j - k)):
+                    if (i + j) // (2 * p) == (i + j + k) // (2 * p):
+                        pairs.append((i + j, i + j + k))
+            k //= 2
+        p *= 2
+    return np.array(pairs, dtype=np.int64)
+
+# Auctions with up to _TINY_ADVERTISERS float32 bidders are ranked with a
+# sorting network of the next width up, which beats the general insertion
+# pass at typical ad-auction sizes
+_TINY_ADVERTISERS = 16
+_TINY_WIDTHS = np.array([2, 4, 8, 16])
+_TINY_NETWORKS = {int(width): _odd_even_merge_sort_network(width) for width in _TINY_WIDTHS}
+_TINY_CHUNK = 256  # Trials per thread task, sharing one set of sort buffers
+_SIGN_BIT = np.uint64(0x80000000)
+_LOW_MASK = np.uint64(0xFFFFFFFF)
+
+@dataclass
+class AuctionBatch:
+    """
+    Outcomes of a batch of simulated auctions, stored as one array per field.
+    
+    Per-trial fields have a leading n_trials axis; slot_ctrs is shared by all
+    trials. Use row(i) for the per-trial dictionary of a single trial.
+    """
+    vals: np.ndarray           # (n_trials, n_advertisers)
+    bids: np.ndarray           # (n_trials, n_advertisers)
+    slot_assign: np.ndarray    # (n_trials, n_slots)
+    slot_ctrs: np.ndarray      # (n_slots,)
+    gsp_payments: np.ndarray   # (n_trials, n_slots)
+    gsp_revenue: np.ndarray    # (n_trials,)
+    gsp_utilities: np.ndarray  # (n_trials, n_slots)
+    vcg_payments: np.ndarray   # (n_trials, n_slots)
+    vcg_revenue: np.ndarray    # (n_trials,)
+    vcg_utilities: np.ndarray  # (n_trials, n_slots)
+    
+    def __len__(self):
+        return self.vals.shape[0]
+    
+    def row(self, i):
+        """
+        Outcome of trial i as a dictionary keyed by field name.
+        """
+        return {
+            'vals': self.vals[i],
+            'bids': self.bids[i],
+            'slot_assign': self.slot_assign[i],
+            'slot_ctrs': self.slot_ctrs,
+            'gsp_payments': self.gsp_payments[i],
+            'gsp_revenue': self.gsp_revenue[i],
+            'gsp_utilities': self.gsp_utilities[i],
+            'vcg_payments': self.vcg_payments[i],
+            'vcg_revenue': self.vcg_revenue[i],
+            'vcg_utilities': self.vcg_utilities[i],
+        }
+    
+    @classmethod
+    def concatenate(cls, batches):
+        """
+        Join batches simulated with the same slots and CTRs along the trial axis.
+        """
+        def cat(field):
+            return np.concatenate([getattr(batch, field) for batch in batches])
+        return cls(
+            vals=cat('vals'),
+            bids=cat('bids'),
+            slot_assign=cat('slot_assign'),
+            slot_ctrs=batches[0].slot_ctrs,
+            gsp_payments=cat('gsp_payments'),
+            gsp_revenue=cat('gsp_revenue'),
+            gsp_utilities=cat('gsp_utilities'),
+            vcg_payments=cat('vcg_payments'),
+            vcg_revenue=cat('vcg_revenue'),
+            vcg_utilities=cat('vcg_utilities'),
+        )
+
 def simulate_auctions(
     n_advertisers=5, 
     n_slots=3, 
@@ -7,7 +113,10 @@ def simulate_auctions(
     value_dist='uniform', 
     dist_params=(0, 1),
     n_trials=1,
-    random_seed=None
+    random_seed=None,
+    rng=None,
+    dtype=np.float32,
+    block_size=None
 ):
     """
     Simulate VCG and GSP auctions for online ad slots.
@@ -19,83 +128,321 @@ def simulate_auctions(
         value_dist: 'uniform' or 'normal'
         dist_params: Parameters for the value distribution
         n_trials: Number of simulation runs
-        random_seed: Seed for reproducibility
+        random_seed: Seed (or SeedSequence) for reproducibility
+        rng: np.random.Generator to draw from; overrides random_seed
+        dtype: Floating dtype for values and payments (float32 or float64);
+            revenues are always accumulated in float64
+        block_size: Trials priced per block; by default all trials at once
+            when numba is available, otherwise sized so a block's NumPy
+            working set fits in about _BLOCK_BYTES of cache
         
     Returns:
-        results: List of dictionaries with auction outcomes per trial
+        results: AuctionBatch of auction outcomes for all trials
     """
-    if random_seed is not None:
-        np.random.seed(random_seed)
+    if rng is None:
+        rng = np.random.default_rng(random_seed)
     if ctrs is None:
         # Default: exponentially decreasing CTRs
         ctrs = [0.5**i for i in range(n_slots)]
-    results = []
-    for _ in range(n_trials):
-        # Sample true values per click for each advertiser
-        if value_dist == 'uniform':
-            vals = np.random.uniform(dist_params[0], dist_params[1], n_advertisers)
-        elif value_dist == 'normal':
-            vals = np.random.normal(dist_params[0], dist_params[1], n_advertisers)
-            vals = np.maximum(vals, 0)  # Ensure non-negative
+    if n_advertisers < n_slots:
+        raise ValueError("Need at least as many advertisers as slots")
+    if len(ctrs) < n_slots:
+        raise ValueError("Need a click-through rate for every slot")
+    
+    # Sample true values per click for every trial and advertiser at once
+    size = (n_trials, n_advertisers)
+    # Cast the parameters so NumPy scalars of another dtype cannot promote vals
+    params = np.asarray(dist_params, dtype=dtype)
+    if value_dist == 'uniform':
+        low, high = params
+        vals = low + (high - low) * rng.random(size, dtype=dtype)
+    elif value_dist == 'normal':
+        loc, scale = params
+        vals = loc + scale * rng.standard_normal(size, dtype=dtype)
+        vals = np.maximum(vals, 0)  # Ensure non-negative
+    else:
+        raise ValueError("Unsupported distribution")
+    
+    # Assume truthful bidding for both mechanisms (VCG is truthful, GSP for comparison)
+    bids = vals.copy()
+    slot_ctrs = np.asarray(ctrs[:n_slots], dtype=dtype)
+    
+    results = AuctionBatch(
+        vals=vals,
+        bids=bids,
+        slot_assign=np.empty((n_trials, n_slots), dtype=np.int64),
+        slot_ctrs=slot_ctrs,
+        gsp_payments=np.empty((n_trials, n_slots), dtype=dtype),
+        gsp_revenue=np.empty(n_trials),
+        gsp_utilities=np.empty((n_trials, n_slots), dtype=dtype),
+        vcg_payments=np.empty((n_trials, n_slots), dtype=dtype),
+        vcg_revenue=np.empty(n_trials),
+        vcg_utilities=np.empty((n_trials, n_slots), dtype=dtype),
+    )
+    
+    # The NumPy kernel prices trials in cache-sized blocks so each block's
+    # intermediates stay resident between the ranking, GSP and VCG steps.
+    # The jitted kernels read each trial once, so blocking gains them nothing
+    # and would only cap how many threads a parallel region can use.
+    if block_size is None:
+        if _HAS_NUMBA:
+            block_size = max(1, n_trials)
         else:
-            raise ValueError("Unsupported distribution")
-        
-        # Assume truthful bidding for both mechanisms (VCG is truthful, GSP for comparison)
-        bids = vals.copy()
-        # Rank advertisers by bid (descending)
-        idx_sorted = np.argsort(-bids)
-        sorted_bids = bids[idx_sorted]
-        sorted_vals = vals[idx_sorted]
-        
-        # Assign slots
-        slot_assign = idx_sorted[:n_slots]
-        slot_vals = sorted_vals[:n_slots]
-        slot_bids = sorted_bids[:n_slots]
-        slot_ctrs = ctrs[:n_slots]
-        
-        # GSP payments: Each pays the next-highest bid per click
-        gsp_payments = []
-        for i in range(n_slots):
-            if i+1 < n_advertisers:
-                pay = sorted_bids[i+1]
-            else:
-                pay = 0.0
-            gsp_payments.append(pay)
-        gsp_payments = np.array(gsp_payments)
-        gsp_revenue = np.sum(slot_ctrs * gsp_payments)
-        gsp_utilities = slot_ctrs * (slot_vals - gsp_payments)
+            trial_bytes = (2 * n_advertisers + 4 * n_slots) * np.dtype(dtype).itemsize
+            block_size = max(1, _BLOCK_BYTES // trial_bytes)
+    for start in range(0, n_trials, block_size):
+        _price_block(results, slice(start, min(start + block_size, n_trials)))
+    return results
+
+def _price_block(results, rows):
+    """
+    Fill slot assignments, payments, revenues and utilities of results[rows].
+    """
+    n_advertisers = results.bids.shape[1]
+    extra_args = ()
+    if not _HAS_NUMBA:
+        price_trials = _price_trials
+    elif n_advertisers <= _TINY_ADVERTISERS and results.bids.dtype == np.float32:
+        width = int(_TINY_WIDTHS[np.searchsorted(_TINY_WIDTHS, n_advertisers)])
+        price_trials = _price_trials_tiny_jit
+        extra_args = (_TINY_NETWORKS[width], width)
+    else:
+        price_trials = _price_trials_jit
+    price_trials(
+        results.bids[rows],
+        results.vals[rows],
+        results.slot_ctrs,
+        results.slot_assign[rows],
+        results.gsp_payments[rows],
+        results.gsp_revenue[rows],
+        results.gsp_utilities[rows],
+        results.vcg_payments[rows],
+        results.vcg_revenue[rows],
+        results.vcg_utilities[rows],
+        *extra_args,
+    )
+
+def _price_trials(
+    bids, vals, slot_ctrs, slot_assign,
+    gsp_payments, gsp_revenue, gsp_utilities,
+    vcg_payments, vcg_revenue, vcg_utilities
+):
+    """
+    Rank advertisers and price GSP and VCG for a block of trials with
+    whole-array NumPy operations; both mechanisms read the same ranked buffer.
+    """
+    n_trials, n_advertisers = bids.shape
+    n_slots = slot_ctrs.size
+    
+    # Rank the top n_slots + 1 advertisers by bid (descending) within each
+    # trial; partitioning first avoids sorting bids that win nothing
+    if n_slots < n_advertisers:
+        top_idx = np.argpartition(-bids, n_slots, axis=1)[:, :n_slots + 1]
+        top_order = np.argsort(-np.take_along_axis(bids, top_idx, axis=1), axis=1)
+        top_idx = np.take_along_axis(top_idx, top_order, axis=1)
+    else:
+        top_idx = np.argsort(-bids, axis=1)
+    
+    # Bids and values of the top n_slots + 1 ranks, zero-padded when nobody
+    # is ranked below the last slot; every payment below reads from these
+    n_ranked = top_idx.shape[1]
+    ranked_bids = np.zeros((n_trials, n_slots + 1), dtype=bids.dtype)
+    ranked_bids[:, :n_ranked] = np.take_along_axis(bids, top_idx, axis=1)
+    ranked_vals = np.zeros((n_trials, n_slots + 1), dtype=vals.dtype)
+    ranked_vals[:, :n_ranked] = np.take_along_axis(vals, top_idx, axis=1)
+    
+    # Assign slots
+    slot_assign[:] = top_idx[:, :n_slots]
+    slot_vals = ranked_vals[:, :n_slots]
+    revenue_ctrs = slot_ctrs.astype(np.float64)
+    
+    # GSP payments: Each pays the next-highest bid per click
+    gsp_payments[:] = ranked_bids[:, 1:]
+    gsp_revenue[:] = gsp_payments.astype(np.float64) @ revenue_ctrs
+    np.multiply(slot_ctrs, slot_vals - gsp_payments, out=gsp_utilities)
+    
+    # VCG payments: Externality imposed on others, which for position auctions
+    # is sum over j > i of (CTR[j-1] - CTR[j]) * value[j], divided by CTR[i]
+    ctr_diffs = slot_ctrs.copy()
+    ctr_diffs[:-1] -= slot_ctrs[1:]
+    np.multiply(ctr_diffs, ranked_vals[:, 1:], out=vcg_payments)
+    np.cumsum(vcg_payments[:, ::-1], axis=1, out=vcg_payments[:, ::-1])
+    vcg_payments /= slot_ctrs
+    vcg_revenue[:] = vcg_payments.astype(np.float64) @ revenue_ctrs
+    np.multiply(slot_ctrs, slot_vals - vcg_payments, out=vcg_utilities)
+
+@njit(parallel=True, cache=True)
+def _price_trials_jit(
+    bids, vals, slot_ctrs, slot_assign,
+    gsp_payments, gsp_revenue, gsp_utilities,
+    vcg_payments, vcg_revenue, vcg_utilities
+):
+    """
+    Same as _price_trials, compiled with trials spread across threads and
+    GSP and VCG priced together in a single pass over each trial's slots.
+    """
+    n_trials, n_advertisers = bids.shape
+    n_slots = slot_ctrs.size
+    n_ranked = min(n_slots + 1, n_advertisers)
+    for t in prange(n_trials):
+        # Rank the top n_slots + 1 advertisers by bid (descending) with an
+        # insertion pass
+        order = np.empty(n_ranked, dtype=np.int64)
+        n_top = 0
+        for adv in range(n_advertisers):
+            bid = bids[t, adv]
+            if n_top == n_ranked and bid <= bids[t, order[n_ranked - 1]]:
+                continue
+            pos = min(n_top, n_ranked - 1)
+            while pos > 0 and bids[t, order[pos - 1]] < bid:
+                order[pos] = order[pos - 1]
+                pos -= 1
+            order[pos] = adv
+            n_top = min(n_top + 1, n_ranked)
         
-        # VCG payments: Externality imposed on others
-        vcg_payments = []
-        for i in range(n_slots):
-            # Remove advertiser i and recompute total value for others
-            others = np.delete(sorted_vals, i)
-            # Assign slots to others
-            others_sorted = np.sort(others)[::-1]
-            # Value with i present
-            value_with_i = np.sum(slot_ctrs * sorted_vals[:n_slots])
-            # Value with i absent
-            value_without_i = np.sum(slot_ctrs * others_sorted[:n_slots])
-            # Payment is the difference in value to others, divided by CTR
-            pay = (value_without_i - (value_with_i - slot_ctrs[i]*slot_vals[i])) / slot_ctrs[i]
-            vcg_payments.append(pay)
-        vcg_payments = np.array(vcg_payments)
-        vcg_revenue = np.sum(slot_ctrs * vcg_payments)
-        vcg_utilities = slot_ctrs * (slot_vals - vcg_payments)
+        _price_ranked_trial(
+            t, order, bids, vals, slot_ctrs, slot_assign,
+            gsp_payments, gsp_revenue, gsp_utilities,
+            vcg_payments, vcg_revenue, vcg_utilities,
+        )
+
+@njit(parallel=True, cache=True)
+def _price_trials_tiny_jit(
+    bids, vals, slot_ctrs, slot_assign,
+    gsp_payments, gsp_revenue, gsp_utilities,
+    vcg_payments, vcg_revenue, vcg_utilities,
+    network, width
+):
+    """
+    _price_trials_jit specialised for float32 bids of at most width
+    advertisers, ranking each trial with a branchless sorting network.
+    
+    Each bid is packed with its advertiser index into one integer key whose
+    order matches _price_trials_jit's ranking, ties included, so both
+    kernels return bit-for-bit identical results.
+    """
+    n_trials, n_advertisers = bids.shape
+    n_chunks = (n_trials + _TINY_CHUNK - 1) // _TINY_CHUNK
+    for chunk in prange(n_chunks):
+        keys = np.empty(width, dtype=np.uint64)
+        order = np.empty(width, dtype=np.int64)
+        for t in range(chunk * _TINY_CHUNK, min((chunk + 1) * _TINY_CHUNK, n_trials)):
+            # High half: float32 bits remapped so unsigned order is bid order
+            # (-0.0 folded into 0.0); low half: inverted advertiser index so
+            # ties rank the lower index first. Padding keys are 0 and rank last.
+            bits = bids[t].view(np.uint32)
+            for adv in range(width):
+                if adv < n_advertisers:
+                    u = np.uint64(bits[adv])
+                    if u == _SIGN_BIT:
+                        u = np.uint64(0)
+                    u = (u ^ _LOW_MASK) if u & _SIGN_BIT else (u | _SIGN_BIT)
+                    keys[adv] = (u << np.uint64(32)) | (_LOW_MASK - np.uint64(adv))
+                else:
+                    keys[adv] = np.uint64(0)
+            
+            # Sort keys descending
+            for c in range(network.shape[0]):
+                lo = network[c, 0]
+                hi = network[c, 1]
+                a = keys[lo]
+                b = keys[hi]
+                keys[lo] = max(a, b)
+                keys[hi] = min(a, b)
+            for rank in range(width):
+                order[rank] = np.int64(_LOW_MASK - (keys[rank] & _LOW_MASK))
+            
+            _price_ranked_trial(
+                t, order, bids, vals, slot_ctrs, slot_assign,
+                gsp_payments, gsp_revenue, gsp_utilities,
+                vcg_payments, vcg_revenue, vcg_utilities,
+            )
+
+@njit(cache=True)
+def _price_ranked_trial(
+    t, order, bids, vals, slot_ctrs, slot_assign,
+    gsp_payments, gsp_revenue, gsp_utilities,
+    vcg_payments, vcg_revenue, vcg_utilities
+):
+    """
+    Price trial t given its advertisers ranked by bid in order[:n_slots + 1].
+    """
+    n_advertisers = bids.shape[1]
+    n_slots = slot_ctrs.size
+    
+    # Walk the slots from the lowest up: GSP charges the next-highest bid,
+    # VCG accumulates the externality on the advertisers ranked below
+    externality = 0.0
+    gsp_total = 0.0
+    vcg_total = 0.0
+    for i in range(n_slots - 1, -1, -1):
+        adv = order[i]
+        ctr = slot_ctrs[i]
+        if i + 1 < n_advertisers:
+            next_bid = bids[t, order[i + 1]]
+            next_val = vals[t, order[i + 1]]
+        else:
+            next_bid = 0.0
+            next_val = 0.0
+        next_ctr = slot_ctrs[i + 1] if i + 1 < n_slots else 0.0
+        externality += (ctr - next_ctr) * next_val
         
-        results.append({
-            'vals': vals,
-            'bids': bids,
-            'slot_assign': slot_assign,
-            'slot_ctrs': slot_ctrs,
-            'gsp_payments': gsp_payments,
-            'gsp_revenue': gsp_revenue,
-            'gsp_utilities': gsp_utilities,
-            'vcg_payments': vcg_payments,
-            'vcg_revenue': vcg_revenue,
-            'vcg_utilities': vcg_utilities,
-        })
-    return results
+        gsp_pay = next_bid
+        vcg_pay = externality / ctr
+        slot_assign[t, i] = adv
+        gsp_payments[t, i] = gsp_pay
+        gsp_utilities[t, i] = ctr * (vals[t, adv] - gsp_pay)
+        vcg_payments[t, i] = vcg_pay
+        vcg_utilities[t, i] = ctr * (vals[t, adv] - vcg_pay)
+        # Revenues accumulate in float64 like the NumPy path
+        gsp_total += np.float64(ctr) * gsp_pay
+        vcg_total += np.float64(ctr) * vcg_pay
+    gsp_revenue[t] = gsp_total
+    vcg_revenue[t] = vcg_total
+
+def simulate_auctions_parallel(n_trials=1, n_workers=None, random_seed=None, rng=None, **kwargs):
+    """
+    Run simulate_auctions with trials split across worker processes.
+    
+    Each worker draws from its own child generator, spawned from rng when
+    given and from SeedSequence(random_seed) otherwise, so the streams never
+    overlap and results are reproducible for a fixed seed and n_workers.
+    Remaining keyword arguments are passed to simulate_auctions. Workers are
+    spawned rather than forked, since numba's threading layer (e.g. TBB) is
+    not fork-safe once the parallel kernels have run in this process. Each
+    worker runs the numba kernels on a single thread, so parallelism comes
+    from the processes alone and n_workers workers use n_workers cores.
+    
+    Returns:
+        results: AuctionBatch as returned by simulate_auctions
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, n_trials))
+    if rng is not None:
+        worker_rngs = rng.spawn(n_workers)
+    else:
+        children = np.random.SeedSequence(random_seed).spawn(n_workers)
+        worker_rngs = [np.random.default_rng(child) for child in children]
+    chunk_sizes = [len(chunk) for chunk in np.array_split(np.arange(n_trials), n_workers)]
+    
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=n_workers, mp_context=mp_context, initializer=_init_worker
+    ) as executor:
+        futures = [
+            executor.submit(simulate_auctions, n_trials=size, rng=worker_rng, **kwargs)
+            for size, worker_rng in zip(chunk_sizes, worker_rngs)
+        ]
+        parts = [future.result() for future in futures]
+    return AuctionBatch.concatenate(parts)
+
+def _init_worker():
+    """
+    Keep numba's parallel kernels single-threaded in a worker process.
+    """
+    if _HAS_NUMBA:
+        set_num_threads(1)
 
 # Example usage:
 if __name__ == "__main__":
@@ -109,7 +456,8 @@ if __name__ == "__main__":
         n_trials=n_trials,
         random_seed=42
     )
-    for i, res in enumerate(results):
+    for i in range(len(results)):
+        res = results.row(i)
         print(f"Trial {i+1}:")
         print("  Values:", np.round(res['vals'], 2))
         print("  GSP payments (per click):", np.round(res['gsp_payments'], 2))